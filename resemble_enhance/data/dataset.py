@@ -20,6 +20,24 @@ def _normalize(x):
     return x / (np.abs(x).max() + 1e-7)
 
 
+def resample(wav, orig_sr, target_sr):
+    """
+    Args:
+        wav: (c t)
+    Returns:
+        wav: (c t'), returned as is if the sample rates match
+    """
+    return AF.resample(
+        waveform=wav,
+        orig_freq=orig_sr,
+        new_freq=target_sr,
+        lowpass_filter_width=64,
+        rolloff=0.9475937167399596,
+        resampling_method="sinc_interp_kaiser",
+        beta=14.769656459379492,
+    )
+
+
 def _collate(batch, key, tensor=True, pad=True):
     l = [d[key] for d in batch]
     if l[0] is None:
@@ -32,6 +50,19 @@ def _collate(batch, key, tensor=True, pad=True):
     return l
 
 
+def _collate_rirs(batch, key):
+    l = [d[key] for d in batch]
+    if l[0] is None:
+        return None
+    # Center-align the kernels so that they share the same offset in mode="same"
+    k = max(len(x) for x in l)
+    rirs = np.zeros((len(l), k), dtype=np.float32)
+    for i, x in enumerate(l):
+        start = (k - 1) // 2 - (len(x) - 1) // 2
+        rirs[i, start : start + len(x)] = x
+    return torch.from_numpy(rirs)
+
+
 def praat_augment(wav, sr):
     try:
         import parselmouth
@@ -85,15 +116,7 @@ class Dataset(DatasetBase):
     def _load_wav(self, path, length=None, random_crop=True):
         wav, sr = torchaudio.load(path)
 
-        wav = AF.resample(
-            waveform=wav,
-            orig_freq=sr,
-            new_freq=self.hp.wav_rate,
-            lowpass_filter_width=64,
-            rolloff=0.9475937167399596,
-            resampling_method="sinc_interp_kaiser",
-            beta=14.769656459379492,
-        )
+        wav = resample(wav, sr, self.hp.wav_rate)
 
         wav = wav.float().numpy()
 
@@ -131,8 +154,11 @@ class Dataset(DatasetBase):
             bg_wav = None
             fg_dwav = None
             bg_dwav = None
+            fg_rir = None
+            bg_rir = None
         else:
             fg_dwav = _normalize(self.distorter(fg_wav, self.hp.wav_rate)).astype(np.float32)
+            fg_rir = self.distorter.pop_rir_kernel()
             if self.training:
                 bg_path = random.choice(self.bg_paths)
             else:
@@ -140,12 +166,15 @@ class Dataset(DatasetBase):
                 bg_path = self.bg_paths[index % len(self.bg_paths)]
             bg_wav = self._load_wav(bg_path, length=len(fg_wav), random_crop=self.training)
             bg_dwav = _normalize(self.distorter(bg_wav, self.hp.wav_rate)).astype(np.float32)
+            bg_rir = self.distorter.pop_rir_kernel()
 
         return dict(
             fg_wav=fg_wav,
             bg_wav=bg_wav,
             fg_dwav=fg_dwav,
             bg_dwav=bg_dwav,
+            fg_rir=fg_rir,
+            bg_rir=bg_rir,
         )
 
     def __getitem__(self, index: int):
@@ -168,4 +197,6 @@ class Dataset(DatasetBase):
             bg_wavs=_collate(batch, "bg_wav"),
             fg_dwavs=_collate(batch, "fg_dwav"),
             bg_dwavs=_collate(batch, "bg_dwav"),
+            fg_rirs=_collate_rirs(batch, "fg_rir"),
+            bg_rirs=_collate_rirs(batch, "bg_rir"),
         )
@@ -1,12 +1,13 @@
 import logging
+import os
 import random
-from dataclasses import dataclass
-from functools import cached_property
+from dataclasses import dataclass, field
+from functools import cache
 from pathlib import Path
 
-import librosa
 import numpy as np
-from scipy import signal
+import soxr
+from scipy.fft import irfft, next_fast_len, rfft
 
 from ..utils import walk_paths
 from .base import Effect
@@ -14,32 +15,66 @@ from .base import Effect
 _logger = logging.getLogger(__name__)
 
 
+def _mix_(wav, noise, alpha):
+    """
+    Scale `noise` to the energy of `wav` and mix them into `noise` in place.
+    """
+    wav_energy = 0.0
+    noise_energy = 0.0
+    for i in range(len(wav)):
+        wav_energy += wav[i] * wav[i]
+        noise_energy += noise[i] * noise[i]
+    scale = (1 - alpha) * np.sqrt(wav_energy / noise_energy)
+    for i in range(len(wav)):
+        noise[i] = wav[i] * alpha + noise[i] * scale
+    return noise
+
+
+@cache
+def _get_mix_kernel():
+    # Import numba and compile on first use, so that importing the distorter stays light
+    import numba
+
+    return numba.njit(cache=True, fastmath=True)(_mix_)
+
+
 @dataclass
 class RandomRIR(Effect):
     rir_dir: Path | None
     rir_rate: int = 44_000
     rir_suffix: str = ".npy"
     deterministic: bool = False
-
-    @cached_property
-    def rir_paths(self):
+    # Record the kernel in `deferred_kernel` instead of convolving, for rir_on_gpu
+    defer: bool = False
+    # Per dataloader worker, at most size * RIR length * 4 bytes (~22MB for 2s RIRs at 44.1kHz)
+    resampled_rir_cache_size: int = 64
+    rir_paths: list[Path] = field(init=False, repr=False, compare=False)
+    resampled_rir_cache: dict[tuple[Path, int], np.ndarray] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    deferred_kernel: np.ndarray | None = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Walk eagerly so that forked dataloader workers inherit the list instead of walking again
         if self.rir_dir is None:
-            return []
-        return list(walk_paths(self.rir_dir, self.rir_suffix))
-
-    def _sample_rir(self):
-        if len(self.rir_paths) == 0:
-            return None
-
-        if self.deterministic:
-            rir_path = self.rir_paths[0]
+            self.rir_paths = []
         else:
-            rir_path = random.choice(self.rir_paths)
-
-        rir = np.squeeze(np.load(rir_path))
-        assert isinstance(rir, np.ndarray)
-
-        return rir
+            self.rir_paths = list(walk_paths(self.rir_dir, self.rir_suffix))
+
+    def _load_resampled_rir(self, rir_path: Path, sr: int) -> np.ndarray:
+        key = (rir_path, sr)
+        if key not in self.resampled_rir_cache:
+            if len(self.resampled_rir_cache) >= self.resampled_rir_cache_size:
+                del self.resampled_rir_cache[next(iter(self.resampled_rir_cache))]
+            # Memory-mapped, the file is read through the page cache shared by the workers
+            rir = np.squeeze(np.asarray(np.load(rir_path, mmap_mode="r"), dtype=np.float32))
+            self.resampled_rir_cache[key] = soxr.resample(rir, self.rir_rate, sr, quality="HQ")
+        return self.resampled_rir_cache[key]
+
+    def _sample_rir_path(self):
+        if self.deterministic:
+            return self.rir_paths[0]
+        return random.choice(self.rir_paths)
 
     def apply(self, wav, sr):
         # ref: https://github.com/haoheliu/voicefixer_main/blob/b06e07c945ac1d309b8a57ddcd599ca376b98cd9/dataloaders/augmentation/magical_effects.py#L158
@@ -47,27 +82,23 @@ class RandomRIR(Effect):
         if len(self.rir_paths) == 0:
             return wav
 
-        length = len(wav)
+        if self.defer:
+            self.deferred_kernel = self._load_resampled_rir(self._sample_rir_path(), sr)
+            return wav
 
-        wav = librosa.resample(wav, orig_sr=sr, target_sr=self.rir_rate, res_type="kaiser_fast")
-        rir = self._sample_rir()
+        # Resample the (short) RIR instead of the waveform, this keeps the length of the waveform unchanged
+        rir = self._load_resampled_rir(self._sample_rir_path(), sr)
 
-        wav = signal.convolve(wav, rir, mode="same")
+        # Convolve in the frequency domain, the RIRs are long
+        n = next_fast_len(len(wav) + len(rir) - 1, real=True)
+        out = irfft(rfft(wav, n) * rfft(rir, n), n)
+        start = (len(rir) - 1) // 2  # Same as mode="same"
+        wav = out[start : start + len(wav)]
 
         actlev = np.max(np.abs(wav))
         if actlev > 0.99:
             wav = (wav / actlev) * 0.98
 
-        wav = librosa.resample(wav, orig_sr=self.rir_rate, target_sr=sr, res_type="kaiser_fast")
-
-        if abs(length - len(wav)) > 10:
-            _logger.warning(f"length mismatch: {length} vs {len(wav)}")
-
-        if length > len(wav):
-            wav = np.pad(wav, (0, length - len(wav)))
-        elif length < len(wav):
-            wav = wav[:length]
-
         return wav
 
 
@@ -75,11 +106,20 @@ class RandomGaussianNoise(Effect):
     def __init__(self, alpha_range=(0.8, 1)):
         super().__init__()
         self.alpha_range = alpha_range
+        self._rng = None
+        self._rng_pid = None
+
+    @property
+    def rng(self) -> np.random.Generator:
+        # Dataloader workers are forked after construction, re-create the generator per process
+        # so that the workers do not share the same noise stream
+        pid = os.getpid()
+        if self._rng is None or self._rng_pid != pid:
+            self._rng = np.random.default_rng()
+            self._rng_pid = pid
+        return self._rng
 
     def apply(self, wav, sr):
-        noise = np.random.randn(*wav.shape)
-        noise_energy = np.sum(noise**2)
-        wav_energy = np.sum(wav**2)
-        noise = noise * np.sqrt(wav_energy / noise_energy)
+        noise = self.rng.standard_normal(wav.shape, dtype=np.float32)
         alpha = random.uniform(*self.alpha_range)
-        return wav * alpha + noise * (1 - alpha)
+        return _get_mix_kernel()(wav, noise, alpha)
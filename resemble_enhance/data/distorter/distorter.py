@@ -1,3 +1,5 @@
+import numpy as np
+
 from ...hparams import HParams
 from .base import Chain, Choice, Permutation
 from .custom import RandomGaussianNoise, RandomRIR
@@ -9,8 +11,10 @@ class Distorter(Chain):
         from .sox import RandomBandpassDistorter, RandomEqualizer, RandomLowpassDistorter, RandomOverdrive, RandomReverb
 
         if training:
+            # When rir_on_gpu is set, the RIR only records its kernel here, see `pop_rir_kernel`
+            self.rir = RandomRIR(hp.rir_dir, defer=hp.rir_on_gpu)
             permutation = Permutation(
-                RandomRIR(hp.rir_dir),
+                self.rir,
                 RandomReverb(),
                 RandomGaussianNoise(),
                 RandomOverdrive(),
@@ -26,7 +30,27 @@ class Distorter(Chain):
                 # 80%: distortion, 20%: clean
                 super().__init__(Choice(permutation, Chain(), p=[0.8, 0.2]))
         else:
+            self.rir = RandomRIR(hp.rir_dir, deterministic=True)
             super().__init__(
-                RandomRIR(hp.rir_dir, deterministic=True),
+                self.rir,
                 RandomReverb(deterministic=True),
             )
+
+    def apply(self, wav, sr):
+        # Drop the kernel left over from a failed call
+        self.rir.deferred_kernel = None
+        return super().apply(wav, sr)
+
+    def pop_rir_kernel(self):
+        """
+        Returns:
+            rir: (K), the RIR deferred by the last call, to be convolved after batching (see `convolve_rirs`),
+                an identity kernel if no RIR was picked, None if RIRs are not deferred
+        """
+        if not self.rir.defer:
+            return None
+        rir = self.rir.deferred_kernel
+        self.rir.deferred_kernel = None
+        if rir is None:
+            return np.ones(1, dtype=np.float32)
+        return rir
@@ -0,0 +1,47 @@
+import argparse
+import logging
+from pathlib import Path
+
+import soundfile
+import torchaudio
+from tqdm import tqdm
+
+from ..hparams import HParams
+from .dataset import resample
+from .utils import rglob_audio_files
+
+logger = logging.getLogger(__name__)
+
+
+def prepare_audio_dir(in_dir: Path, out_dir: Path, target_sr: int):
+    """
+    Resample all audio files under `in_dir` to `target_sr` once, so that the dataset does not
+    need to resample them on every load.
+    """
+    paths = rglob_audio_files(in_dir)
+    logger.info(f"Found {len(paths)} audio files in {in_dir}")
+
+    for path in tqdm(paths):
+        out_path = (out_dir / path.relative_to(in_dir)).with_suffix(".wav")
+        if out_path.exists():
+            continue
+        wav, sr = torchaudio.load(path)
+        wav = resample(wav, sr, target_sr)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        soundfile.write(out_path, wav.T.numpy(), samplerate=target_sr, subtype="FLOAT")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resample an audio dataset (e.g., data/bg) to the training rate")
+    parser.add_argument("in_dir", type=Path)
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--rate", type=int, default=HParams.wav_rate)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    prepare_audio_dir(args.in_dir, args.out_dir, args.rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,44 @@
+import os
 from pathlib import Path
 from typing import Callable
 
+import torch
 from torch import Tensor
 
 
 def walk_paths(root, suffix):
-    for path in Path(root).iterdir():
-        if path.is_dir():
-            yield from walk_paths(path, suffix)
-        elif path.suffix == suffix:
-            yield path
+    # Iterative depth-first walk with os.scandir, yields in the same order as a recursive iterdir
+    stack = [os.scandir(root)]
+    try:
+        while stack:
+            entry = next(stack[-1], None)
+            if entry is None:
+                stack.pop().close()
+            elif entry.is_dir():
+                stack.append(os.scandir(entry.path))
+            else:
+                path = Path(entry.path)
+                if path.suffix == suffix:
+                    yield path
+    finally:
+        for it in stack:
+            it.close()
 
 
 def rglob_audio_files(path: Path):
     return list(walk_paths(path, ".wav")) + list(walk_paths(path, ".flac"))
 
 
+def _peak_energy_scale(x: Tensor, eps: float):
+    """
+    Returns:
+        scale: (b 1), such that x * scale == y / sqrt(sum(y**2) + eps) where y = x / (max(abs(x)) + eps)
+    """
+    peak = x.abs().amax(dim=-1, keepdim=True) + eps
+    energy = torch.linalg.vector_norm(x, dim=-1, keepdim=True).square() / peak.square()
+    return 1 / (peak * (energy + eps).sqrt())
+
+
 def mix_fg_bg(fg: Tensor, bg: Tensor, alpha: float | Callable[..., float] = 0.5, eps=1e-7):
     """
     Args:
@@ -23,21 +46,35 @@ def mix_fg_bg(fg: Tensor, bg: Tensor, alpha: float | Callable[..., float] = 0.5,
         bg: (b, t)
     """
     assert bg.shape == fg.shape, f"bg.shape != fg.shape: {bg.shape} != {fg.shape}"
-    fg = fg / (fg.abs().max(dim=-1, keepdim=True).values + eps)
-    bg = bg / (bg.abs().max(dim=-1, keepdim=True).values + eps)
-
-    fg_energy = fg.pow(2).sum(dim=-1, keepdim=True)
-    bg_energy = bg.pow(2).sum(dim=-1, keepdim=True)
-
-    fg = fg / (fg_energy + eps).sqrt()
-    bg = bg / (bg_energy + eps).sqrt()
 
     if callable(alpha):
         alpha = alpha()
 
     assert 0 <= alpha <= 1, f"alpha must be between 0 and 1: {alpha}"
 
-    mx = alpha * fg + (1 - alpha) * bg
-    mx = mx / (mx.abs().max(dim=-1, keepdim=True).values + eps)
+    # Fold the peak and energy normalization into per-row scales to avoid extra passes over the waveforms
+    mx = fg * (alpha * _peak_energy_scale(fg, eps)) + bg * ((1 - alpha) * _peak_energy_scale(bg, eps))
+    mx = mx / (mx.abs().amax(dim=-1, keepdim=True) + eps)
 
     return mx
+
+
+def convolve_rirs(wavs: Tensor, rirs: Tensor, eps=1e-7):
+    """
+    Batched counterpart of `RandomRIR`, convolves in the frequency domain as the kernels are long.
+
+    Args:
+        wavs: (b t)
+        rirs: (b k), center-aligned kernels
+    Returns:
+        wavs: (b t), peak normalized
+    """
+    assert wavs.shape[0] == rirs.shape[0], f"Batch size mismatch: {wavs.shape[0]} != {rirs.shape[0]}"
+    t = wavs.shape[-1]
+    k = rirs.shape[-1]
+    n = 1 << (t + k - 2).bit_length()  # Next power of two, prime FFT sizes are much slower
+    wavs = torch.fft.irfft(torch.fft.rfft(wavs.float(), n=n) * torch.fft.rfft(rirs.float(), n=n), n=n)
+    start = (k - 1) // 2  # Same as mode="same"
+    wavs = wavs[..., start : start + t]
+    wavs = wavs / (wavs.abs().max(dim=-1, keepdim=True).values + eps)
+    return wavs
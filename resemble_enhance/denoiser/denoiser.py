@@ -15,6 +15,12 @@ def _normalize(x: Tensor) -> Tensor:
     return x / (x.abs().max(dim=-1, keepdim=True).values + 1e-7)
 
 
+@torch.jit.script
+def _apply_mask(mag: Tensor, mag_mask_logits: Tensor) -> Tensor:
+    # Scripted so that the fuser emits a single kernel for sigmoid, mul and relu
+    return F.relu(mag * mag_mask_logits.sigmoid())
+
+
 class Denoiser(nn.Module):
     @property
     def stft_cfg(self) -> dict:
@@ -32,12 +38,33 @@ class Denoiser(nn.Module):
     def __init__(self, hp: HParams):
         super().__init__()
         self.hp = hp
-        self.net = UNet(input_dim=3, output_dim=3)
+        self.net = UNet(
+            input_dim=3,
+            output_dim=3,
+            separable=hp.unet_separable,
+            channels_last=hp.unet_channels_last,
+        )
         self.mel_fn = MelSpectrogram(hp)
 
+        self._compiled_net_forward = None
+        self._amp_dtype: torch.dtype | None = None
+
         self.dummy: Tensor
         self.register_buffer("dummy", torch.zeros(1), persistent=False)
 
+    def enable_amp_(self, dtype: torch.dtype):
+        """
+        Run the UNet under autocast, the STFT/ISTFT and the loss stay in fp32.
+        """
+        self._amp_dtype = dtype
+
+    def compile_net_(self, mode: str | None = None):
+        """
+        Compile the UNet for training, mode="reduce-overhead" also replays it as a CUDA graph.
+        The compiled forward is kept out of the module tree and eval (variable lengths) runs the net directly.
+        """
+        self._compiled_net_forward = torch.compile(self.net.forward, mode=mode)
+
     def to_mel(self, x: Tensor, drop_last=True):
         """
         Args:
@@ -132,21 +159,30 @@ class Denoiser(nn.Module):
             cos: (b f t)
             sin: (b f t)
         Returns:
-            mag_mask: (b f t) in [0, 1], magnitude mask
+            mag_mask_logits: (b f t), magnitude mask before sigmoid
             cos_res: (b f t) in [-1, 1], phase residual
             sin_res: (b f t) in [-1, 1], phase residual
         """
         x = torch.stack([mag, cos, sin], dim=1)  # (b 3 f t)
-        mag_mask, real, imag = self.net(x).unbind(1)  # (b 3 f t)
-        mag_mask = mag_mask.sigmoid()  # (b f t)
+        if self.training and self._compiled_net_forward is not None:
+            net = self._compiled_net_forward
+        else:
+            net = self.net
+        if self._amp_dtype is None:
+            o = net(x)
+        else:
+            with torch.autocast(device_type=x.device.type, dtype=self._amp_dtype):
+                o = net(x)
+            o = o.float()
+        mag_mask_logits, real, imag = o.unbind(1)  # (b 3 f t)
         real = real.tanh()  # (b f t)
         imag = imag.tanh()  # (b f t)
         _, cos_res, sin_res = self._magphase(real, imag)  # (b f t)
-        return mag_mask, sin_res, cos_res
+        return mag_mask_logits, sin_res, cos_res
 
-    def _separate(self, mag, cos, sin, mag_mask, cos_res, sin_res):
+    def _separate(self, mag, cos, sin, mag_mask_logits, cos_res, sin_res):
         """Ref: https://audio-agi.github.io/Separate-Anything-You-Describe/AudioSep_arXiv.pdf"""
-        sep_mag = F.relu(mag * mag_mask)
+        sep_mag = _apply_mask(mag, mag_mask_logits)
         sep_cos = cos * cos_res - sin * sin_res
         sep_sin = sin * cos_res + cos * sin_res
         return sep_mag, sep_cos, sep_sin
@@ -167,8 +203,8 @@ class Denoiser(nn.Module):
             y = _normalize(y)
 
         mag, cos, sin = self._stft(x)  # (b 2f t)
-        mag_mask, sin_res, cos_res = self._predict(mag, cos, sin)
-        sep_mag, sep_cos, sep_sin = self._separate(mag, cos, sin, mag_mask, cos_res, sin_res)
+        mag_mask_logits, sin_res, cos_res = self._predict(mag, cos, sin)
+        sep_mag, sep_cos, sep_sin = self._separate(mag, cos, sin, mag_mask_logits, cos_res, sin_res)
 
         o = self._istft(sep_mag, sep_cos, sep_sin)
 
@@ -7,3 +7,8 @@ from ..hparams import HParams as HParamsBase
 class HParams(HParamsBase):
     batch_size_per_gpu: int = 128
     distort_prob: float = 0.5
+    torch_compile: bool = False
+    amp_dtype: str | None = None  # None or "bf16", only the UNet runs under autocast
+    use_cuda_graph: bool = False  # Compiles with mode="reduce-overhead", implies torch_compile
+    unet_separable: bool = False
+    unet_channels_last: bool = False
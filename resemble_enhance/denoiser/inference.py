@@ -4,6 +4,7 @@ from functools import cache
 import torch
 
 from ..inference import inference
+from ..utils import load_module_state_dict
 from .train import Denoiser, HParams
 
 logger = logging.getLogger(__name__)
@@ -15,8 +16,7 @@ def load_denoiser(run_dir, device):
         return Denoiser(HParams())
     hp = HParams.load(run_dir)
     denoiser = Denoiser(hp)
-    path = run_dir / "ds" / "G" / "default" / "mp_rank_00_model_states.pt"
-    state_dict = torch.load(path)["module"]
+    state_dict = load_module_state_dict(run_dir / "ds" / "G")
     denoiser.load_state_dict(state_dict)
     denoiser.eval()
     denoiser.to(device)
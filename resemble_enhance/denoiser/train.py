@@ -9,7 +9,7 @@ from deepspeed import DeepSpeedConfig
 from torch import Tensor
 from tqdm import tqdm
 
-from ..data import create_dataloaders, mix_fg_bg
+from ..data import convolve_rirs, create_dataloaders, mix_fg_bg
 from ..utils import Engine, TrainLoop, save_mels, setup_logging, tree_map
 from ..utils.distributed import is_local_leader
 from .denoiser import Denoiser
@@ -21,6 +21,14 @@ def load_G(run_dir: Path, hp: HParams | None = None, training=True):
         hp = HParams.load(run_dir)
     assert isinstance(hp, HParams)
     model = Denoiser(hp)
+    if training and (hp.torch_compile or hp.use_cuda_graph):
+        # CUDA graphs rely on the fixed length of training segments
+        model.compile_net_(mode="reduce-overhead" if hp.use_cuda_graph else None)
+    if training and hp.amp_dtype is not None:
+        if hp.amp_dtype != "bf16":
+            # fp16 would need loss scaling, which is not wired up
+            raise ValueError(f"Unsupported amp_dtype: {hp.amp_dtype}, only bf16 is supported")
+        model.enable_amp_(torch.bfloat16)
     engine = Engine(model=model, config_class=DeepSpeedConfig(hp.deepspeed_config), ckpt_dir=run_dir / "ds" / "G")
     if training:
         engine.load_checkpoint()
@@ -52,6 +60,9 @@ def main():
 
     def feed_G(engine: Engine, batch: dict[str, Tensor]):
         alpha_fn = lambda: random.uniform(*hp.mix_alpha_range)
+        if batch["fg_rirs"] is not None:
+            batch["fg_dwavs"] = convolve_rirs(batch["fg_dwavs"], batch["fg_rirs"])
+            batch["bg_dwavs"] = convolve_rirs(batch["bg_dwavs"], batch["bg_rirs"])
         if random.random() < hp.distort_prob:
             fg_wavs = batch["fg_dwavs"]
         else:
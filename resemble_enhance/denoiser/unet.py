@@ -1,16 +1,27 @@
+import torch
 import torch.nn.functional as F
 from torch import nn
 
 
+def _make_conv(dim, separable=False):
+    if separable:
+        # Depthwise 3x3 followed by pointwise 1x1
+        return nn.Sequential(
+            nn.Conv2d(dim, dim, 3, padding=1, groups=dim),
+            nn.Conv2d(dim, dim, 1),
+        )
+    return nn.Conv2d(dim, dim, 3, padding=1)
+
+
 class PreactResBlock(nn.Sequential):
-    def __init__(self, dim):
+    def __init__(self, dim, separable=False):
         super().__init__(
             nn.GroupNorm(dim // 16, dim),
             nn.GELU(),
-            nn.Conv2d(dim, dim, 3, padding=1),
+            _make_conv(dim, separable),
             nn.GroupNorm(dim // 16, dim),
             nn.GELU(),
-            nn.Conv2d(dim, dim, 3, padding=1),
+            _make_conv(dim, separable),
         )
 
     def forward(self, x):
@@ -18,13 +29,13 @@ class PreactResBlock(nn.Sequential):
 
 
 class UNetBlock(nn.Module):
-    def __init__(self, input_dim, output_dim=None, scale_factor=1.0):
+    def __init__(self, input_dim, output_dim=None, scale_factor=1.0, separable=False):
         super().__init__()
         if output_dim is None:
             output_dim = input_dim
         self.pre_conv = nn.Conv2d(input_dim, output_dim, 3, padding=1)
-        self.res_block1 = PreactResBlock(output_dim)
-        self.res_block2 = PreactResBlock(output_dim)
+        self.res_block1 = PreactResBlock(output_dim, separable=separable)
+        self.res_block2 = PreactResBlock(output_dim, separable=separable)
         self.downsample = self.upsample = nn.Identity()
         if scale_factor > 1:
             self.upsample = nn.Upsample(scale_factor=scale_factor)
@@ -51,23 +62,43 @@ class UNetBlock(nn.Module):
 
 
 class UNet(nn.Module):
-    def __init__(self, input_dim, output_dim, hidden_dim=16, num_blocks=4, num_middle_blocks=2):
+    def __init__(
+        self,
+        input_dim,
+        output_dim,
+        hidden_dim=16,
+        num_blocks=4,
+        num_middle_blocks=2,
+        separable=False,
+        channels_last=False,
+    ):
         super().__init__()
         self.input_dim = input_dim
         self.output_dim = output_dim
+        self.channels_last = channels_last
         self.input_proj = nn.Conv2d(input_dim, hidden_dim, 3, padding=1)
         self.encoder_blocks = nn.ModuleList(
             [
-                UNetBlock(input_dim=hidden_dim * 2**i, output_dim=hidden_dim * 2 ** (i + 1), scale_factor=0.5)
+                UNetBlock(
+                    input_dim=hidden_dim * 2**i,
+                    output_dim=hidden_dim * 2 ** (i + 1),
+                    scale_factor=0.5,
+                    separable=separable,
+                )
                 for i in range(num_blocks)
             ]
         )
         self.middle_blocks = nn.ModuleList(
-            [UNetBlock(input_dim=hidden_dim * 2**num_blocks) for _ in range(num_middle_blocks)]
+            [UNetBlock(input_dim=hidden_dim * 2**num_blocks, separable=separable) for _ in range(num_middle_blocks)]
         )
         self.decoder_blocks = nn.ModuleList(
             [
-                UNetBlock(input_dim=hidden_dim * 2 ** (i + 1), output_dim=hidden_dim * 2**i, scale_factor=2)
+                UNetBlock(
+                    input_dim=hidden_dim * 2 ** (i + 1),
+                    output_dim=hidden_dim * 2**i,
+                    scale_factor=2,
+                    separable=separable,
+                )
                 for i in reversed(range(num_blocks))
             ]
         )
@@ -76,6 +107,9 @@ class UNet(nn.Module):
             nn.GELU(),
             nn.Conv2d(hidden_dim, output_dim, 1),
         )
+        if channels_last:
+            # NHWC lets cuDNN pick the tensor core kernels
+            self.to(memory_format=torch.channels_last)
 
     @property
     def scale_factor(self):
@@ -102,6 +136,8 @@ class UNet(nn.Module):
         shape = x.shape
 
         x = self.pad_to_fit(x)
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
         x = self.input_proj(x)
 
         s_list = []
@@ -10,6 +10,7 @@ from ..common import Normalizer
 from ..denoiser.inference import load_denoiser
 from ..melspec import MelSpectrogram
 from ..utils.distributed import global_leader_only
+from ..utils.engine import load_module_state_dict
 from ..utils.train_loop import TrainLoop
 from .hparams import HParams
 from .lcfm import CFM, IRMAE, LCFM
@@ -69,8 +70,7 @@ class Enhancer(nn.Module):
         self.register_buffer("dummy", torch.zeros(1))
 
         if self.hp.enhancer_stage1_run_dir is not None:
-            pretrained_path = self.hp.enhancer_stage1_run_dir / "ds/G/default/mp_rank_00_model_states.pt"
-            self._load_pretrained(pretrained_path)
+            self._load_pretrained(self.hp.enhancer_stage1_run_dir / "ds" / "G")
 
         logger.info(f"{self.__class__.__name__} summary")
         logger.info(f"{self.summarize()}")
@@ -79,7 +79,7 @@ class Enhancer(nn.Module):
         # Clone is necessary as otherwise it holds a reference to the original model
         cfm_state_dict = {k: v.clone() for k, v in self.lcfm.cfm.state_dict().items()}
         denoiser_state_dict = {k: v.clone() for k, v in self.denoiser.state_dict().items()}
-        state_dict = torch.load(path, map_location="cpu")["module"]
+        state_dict = load_module_state_dict(path)
         self.load_state_dict(state_dict, strict=False)
         self.lcfm.cfm.load_state_dict(cfm_state_dict)  # Reset cfm
         self.denoiser.load_state_dict(denoiser_state_dict)  # Reset denoiser
@@ -5,6 +5,7 @@ from pathlib import Path
 import torch
 
 from ..inference import inference
+from ..utils import load_module_state_dict
 from .download import download
 from .train import Enhancer, HParams
 
@@ -16,8 +17,7 @@ def load_enhancer(run_dir: str | Path | None, device):
     run_dir = download(run_dir)
     hp = HParams.load(run_dir)
     enhancer = Enhancer(hp)
-    path = run_dir / "ds" / "G" / "default" / "mp_rank_00_model_states.pt"
-    state_dict = torch.load(path, map_location="cpu")["module"]
+    state_dict = load_module_state_dict(run_dir / "ds" / "G")
     enhancer.load_state_dict(state_dict)
     enhancer.eval()
     enhancer.to(device)
@@ -9,7 +9,7 @@ from deepspeed import DeepSpeedConfig
 from torch import Tensor
 from tqdm import tqdm
 
-from ..data import create_dataloaders, mix_fg_bg
+from ..data import convolve_rirs, create_dataloaders, mix_fg_bg
 from ..utils import Engine, TrainLoop, save_mels, setup_logging, tree_map
 from ..utils.distributed import is_local_leader
 from .enhancer import Enhancer
@@ -66,6 +66,9 @@ def main():
             pred = engine(batch["fg_wavs"], batch["fg_wavs"])
         elif hp.lcfm_training_mode == "cfm":
             alpha_fn = lambda: random.uniform(*hp.mix_alpha_range)
+            if batch["fg_rirs"] is not None:
+                batch["fg_dwavs"] = convolve_rirs(batch["fg_dwavs"], batch["fg_rirs"])
+                batch["bg_dwavs"] = convolve_rirs(batch["bg_dwavs"], batch["bg_rirs"])
             mx_dwavs = mix_fg_bg(batch["fg_dwavs"], batch["bg_dwavs"], alpha=alpha_fn)
             pred = engine(mx_dwavs, batch["fg_wavs"], batch["fg_dwavs"])
         else:
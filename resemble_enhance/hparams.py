@@ -38,6 +38,8 @@ class HParams:
     fg_dir: Path = Path("data/fg")
     bg_dir: Path = Path("data/bg")
     rir_dir: Path = Path("data/rir")
+    # Convolve the RIRs picked by the distorter after batching, note they then come after the other distortions
+    rir_on_gpu: bool = False
     load_fg_only: bool = False
     praat_augment_prob: float = 0
 
@@ -55,6 +57,7 @@ class HParams:
     nj: int = 64
     training_seconds: float = 1.0
     batch_size_per_gpu: int = 16
+    gradient_accumulation_steps: int = 1
     min_lr: float = 1e-5
     max_lr: float = 1e-4
     warmup_steps: int = 1000
@@ -65,6 +68,7 @@ class HParams:
     def deepspeed_config(self):
         return {
             "train_micro_batch_size_per_gpu": self.batch_size_per_gpu,
+            "gradient_accumulation_steps": self.gradient_accumulation_steps,
             "optimizer": {
                 "type": "Adam",
                 "params": {"lr": float(self.min_lr)},
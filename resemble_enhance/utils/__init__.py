@@ -1,5 +1,5 @@
 from .distributed import global_leader_only
-from .engine import Engine, gather_attribute
+from .engine import Engine, gather_attribute, load_module_state_dict
 from .logging import setup_logging
 from .train_loop import TrainLoop, is_global_leader
 from .utils import save_mels, tree_map
@@ -1,21 +1,26 @@
 import logging
 import re
 from functools import cache, partial
+from pathlib import Path
 from typing import Callable, TypeVar
 
 import deepspeed
 import pandas as pd
+import torch
 from deepspeed.accelerator import get_accelerator
 from deepspeed.runtime.engine import DeepSpeedEngine
 from deepspeed.runtime.utils import clip_grad_norm_
-from torch import nn
+from safetensors.torch import load_file, save_file
+from torch import Tensor, nn
 
-from .distributed import fix_unset_envs
+from .distributed import fix_unset_envs, is_global_leader
 
 logger = logging.getLogger(__name__)
 
 T = TypeVar("T")
 
+_MODULE_STATES_NAME = "model.safetensors"
+
 
 def flatten_dict(d):
     records = pd.json_normalize(d, sep="/").to_dict(orient="records")
@@ -65,6 +70,17 @@ def init_distributed():
     deepspeed.init_distributed(get_accelerator().communication_backend_name())
 
 
+def load_module_state_dict(ckpt_dir: Path, tag="default"):
+    """
+    Load the model weights saved by `Engine.save_checkpoint`, prefers the safetensors export
+    and falls back to the DeepSpeed model states for older checkpoints.
+    """
+    path = ckpt_dir / tag / _MODULE_STATES_NAME
+    if path.exists():
+        return load_file(path, device="cpu")
+    return torch.load(ckpt_dir / tag / "mp_rank_00_model_states.pt", map_location="cpu")["module"]
+
+
 def _try_each(*fns, e=None):
     if len(fns) == 0:
         raise RuntimeError("All functions failed")
@@ -112,22 +128,43 @@ class Engine(DeepSpeedEngine):
         return dispatch_attribute(self.module, *args, **kwargs)
 
     def clip_fp32_gradients(self):
-        self._fp32_grad_norm = clip_grad_norm_(
-            parameters=self.module.parameters(),
-            max_norm=self.gradient_clipping(),
-            mpu=self.mpu,
-        )
+        if self.mpu is None:
+            # Multi-tensor kernels instead of a python loop over the parameters
+            # Keep the norm on device, it is only synced when get_grad_norm is called
+            self._fp32_grad_norm = torch.nn.utils.clip_grad_norm_(
+                parameters=self.module.parameters(),
+                max_norm=self.gradient_clipping(),
+                foreach=True,
+            )
+        else:
+            self._fp32_grad_norm = clip_grad_norm_(
+                parameters=self.module.parameters(),
+                max_norm=self.gradient_clipping(),
+                mpu=self.mpu,
+            )
 
     def get_grad_norm(self):
         grad_norm = self.get_global_grad_norm()
         if grad_norm is None:
             grad_norm = self._fp32_grad_norm
+        if isinstance(grad_norm, Tensor):
+            grad_norm = grad_norm.item()
         return grad_norm
 
-    def save_checkpoint(self, *args, **kwargs):
+    def _save_module_states(self, tag):
+        # Weights only, so that inference can skip unpickling the full DeepSpeed states
+        state_dict = {k: v.detach().cpu().contiguous() for k, v in self.module.state_dict().items()}
+        save_file(state_dict, self._ckpt_dir / tag / _MODULE_STATES_NAME)
+
+    def save_checkpoint(self, *args, tag=None, **kwargs):
         if not self._ckpt_dir.exists():
             self._ckpt_dir.mkdir(parents=True, exist_ok=True)
-        super().save_checkpoint(save_dir=self._ckpt_dir, *args, **kwargs)
+        # This is a collective call, all ranks must enter it
+        super().save_checkpoint(save_dir=self._ckpt_dir, *args, tag=tag, **kwargs)
+        if tag is None:
+            tag = f"global_step{self.global_steps}"
+        if is_global_leader():
+            self._save_module_states(tag)
         logger.info(f"Saved checkpoint to {self._ckpt_dir}")
 
     def load_checkpoint(self, *args, **kwargs):
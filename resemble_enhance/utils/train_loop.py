@@ -171,6 +171,9 @@ class TrainLoop:
                     logger.error("Generator loss is NaN, skipping step")
                     continue
 
+                # Gradients are only all-reduced and applied at the accumulation boundary
+                boundary = engine_G.is_gradient_accumulation_boundary()
+
                 engine_G.backward(loss_G)
                 engine_G.step()
 
@@ -202,6 +205,10 @@ class TrainLoop:
                     stats["D/lr"] = engine_D.get_lr()[0]
                     stats["D/grad_norm"] = engine_D.get_grad_norm() or 0
 
+                if not boundary:
+                    # The global step has not advanced yet
+                    continue
+
                 torch.cuda.synchronize()
                 stats["elapsed_time"] = time.time() - start_time
                 stats = tree_map(lambda x: float(f"{x:.4g}") if isinstance(x, float) else x, stats)